@@ -1,46 +1,520 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from datetime import datetime
 import json
+import asyncio
+import ipaddress
+import itertools
+import logging
+import logging.handlers
+import os
+import random
+import re
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
 
-st.set_page_config(page_title="Indelible Frame", page_icon="🎬", layout="wide")
+METRICS_PATH = os.environ.get("INDELIBLE_METRICS_PATH", "indelible_metrics.jsonl")
+METRICS_PROM_PATH = os.environ.get("INDELIBLE_METRICS_PROM_PATH", "indelible_metrics.prom")
+METRICS_MAX_BYTES = int(os.environ.get("INDELIBLE_METRICS_MAX_BYTES", 5 * 1024 * 1024))
+METRICS_BACKUPS = int(os.environ.get("INDELIBLE_METRICS_BACKUPS", 3))
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 40000, 80000)
+PRICE_INPUT_PER_MTOK = float(os.environ.get("INDELIBLE_PRICE_INPUT_PER_MTOK", 3.0))
+PRICE_OUTPUT_PER_MTOK = float(os.environ.get("INDELIBLE_PRICE_OUTPUT_PER_MTOK", 15.0))
+PRICE_PER_WEB_SEARCH = float(os.environ.get("INDELIBLE_PRICE_PER_WEB_SEARCH", 0.01))
 
-if 'boards' not in st.session_state:
-    st.session_state.boards = ['1860s Ireland', 'Sci-Fi Dystopia']
-    st.session_state.current_board = '1860s Ireland'
-    st.session_state.pinned_items = {}
-    st.session_state.search_results = []
-    st.session_state.selected_items = set()
+class Metrics:
+    """Process-wide counters and latency histograms, mirrored to a rotating JSONL event log"""
 
-def search_with_ai(query, content_type):
-    """Real AI-powered web search with content type filtering"""
-    try:
-        import anthropic
-        import os
-        
-        client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-        
-        # Customize search instruction based on content type
-        if content_type == "all":
-            type_instruction = "Find 15 diverse sources: mix of articles, images, videos, and PDFs."
-        elif content_type == "images":
-            type_instruction = "Find 15 IMAGE sources only. Look for: photo archives, museum collections, Pinterest boards, Flickr albums, historical image databases, Google Images results."
-        elif content_type == "articles":
-            type_instruction = "Find 15 ARTICLE sources only. Look for: historical articles, blog posts, encyclopedia entries, news archives, educational websites."
-        elif content_type == "videos":
-            type_instruction = "Find 15 VIDEO sources only. Look for: YouTube videos, documentaries, educational channels, PBS content, historical footage archives."
-        elif content_type == "pdfs":
-            type_instruction = "Find 15 PDF DOCUMENT sources only. Look for: research papers on Google Scholar, academic journals, historical documents, museum reports."
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.logger = logging.getLogger("indelible_frame.metrics")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=METRICS_MAX_BYTES, backupCount=METRICS_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, ms, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            hist = self.histograms.setdefault(key, {"buckets": [0] * len(LATENCY_BUCKETS_MS), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if ms <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += ms
+            hist["count"] += 1
+
+    def log(self, event, **fields):
+        self.logger.info(json.dumps({"ts": time.time(), "event": event, **fields}))
+
+    def prometheus_text(self):
+        """Current counters and histograms in the Prometheus text exposition format"""
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
         
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4000,
-            tools=[{
-                "type": "web_search_20250305",
-                "name": "web_search"
-            }],
-            messages=[{
-                "role": "user",
-                "content": f"""Search the web for: "{query}"
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE indelible_{name} counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"indelible_{name}{fmt(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE indelible_{name} histogram")
+                for (n, labels), hist in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    for bound, count in zip(LATENCY_BUCKETS_MS, hist["buckets"]):
+                        lines.append(f"indelible_{name}_bucket{fmt(labels, [('le', bound)])} {count}")
+                    lines.append(f"indelible_{name}_bucket{fmt(labels, [('le', '+Inf')])} {hist['count']}")
+                    lines.append(f"indelible_{name}_sum{fmt(labels)} {hist['sum']:.1f}")
+                    lines.append(f"indelible_{name}_count{fmt(labels)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+@st.cache_resource
+def get_metrics():
+    return Metrics(METRICS_PATH)
+
+def record_span(stage, ms, fields=None, **labels):
+    """Labels split the latency histogram, so keep them low-cardinality; fields only go to the event log"""
+    get_metrics().observe("stage_latency_ms", ms, stage=stage, **labels)
+    get_metrics().log("span", stage=stage, ms=round(ms, 1), **labels, **(fields or {}))
+
+@contextmanager
+def timed(stage, fields=None, **labels):
+    """Record how long the enclosed block takes as one pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, (time.perf_counter() - start) * 1000, fields, **labels)
+
+def record_search(content_type, source, ms, results=0):
+    """One search branch finished; source is cache, ai, partial or error"""
+    get_metrics().increment("searches_total", content_type=content_type, source=source)
+    if source in ("ai", "partial"):
+        get_metrics().observe("search_latency_ms", ms, content_type=content_type)
+    get_metrics().log("search", content_type=content_type, source=source, ms=round(ms, 1), results=results)
+
+def record_fallback(content_type):
+    get_metrics().increment("fallbacks_total", content_type=content_type)
+    get_metrics().log("fallback", content_type=content_type)
+
+def record_usage(content_type, usage):
+    """Token and web search counts from message.usage, with an estimated dollar cost"""
+    if usage is None:
+        return
+    server_tool_use = getattr(usage, 'server_tool_use', None)
+    input_tokens = usage.input_tokens or 0
+    output_tokens = usage.output_tokens or 0
+    web_searches = getattr(server_tool_use, 'web_search_requests', 0) or 0
+    cost = (input_tokens * PRICE_INPUT_PER_MTOK + output_tokens * PRICE_OUTPUT_PER_MTOK) / 1_000_000 + web_searches * PRICE_PER_WEB_SEARCH
+    get_metrics().increment("tokens_total", input_tokens, kind="input")
+    get_metrics().increment("tokens_total", output_tokens, kind="output")
+    get_metrics().increment("web_searches_total", web_searches)
+    get_metrics().increment("cost_usd_total", cost)
+    get_metrics().log("usage", content_type=content_type, input_tokens=input_tokens, output_tokens=output_tokens,
+                      web_searches=web_searches, cost_usd=round(cost, 6))
+
+def metrics_log_stamp():
+    """Changes whenever an event is appended to the log, so cached reads never miss new searches"""
+    try:
+        stat = os.stat(METRICS_PATH)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+@st.cache_data(ttl=30)
+def load_metric_events(since, stamp=None):
+    """Metric events newer than `since` from the JSONL log and its rotated backups; pass metrics_log_stamp() as `stamp`"""
+    import pandas as pd
+    
+    rows = []
+    for path in [f"{METRICS_PATH}.{i}" for i in range(METRICS_BACKUPS, 0, -1)] + [METRICS_PATH]:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if row.get("ts", 0) >= since:
+                    rows.append(row)
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df["time"] = pd.to_datetime(df["ts"], unit="s")
+    return df
+
+DB_PATH = os.environ.get("INDELIBLE_DB_PATH", "indelible_frame.db")
+DEFAULT_BOARDS = ['1860s Ireland', 'Sci-Fi Dystopia']
+BOARD_PAGE_SIZE = int(os.environ.get("INDELIBLE_BOARD_PAGE_SIZE", 60))
+BOARD_PAGE_SIZES = sorted({30, 60, 120, 240, BOARD_PAGE_SIZE})
+CACHE_TTL_SECONDS = int(os.environ.get("INDELIBLE_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.environ.get("INDELIBLE_CACHE_MAX_ENTRIES", 1000))
+
+def db_connect():
+    """Open a connection to the shared on-disk database"""
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+@st.cache_resource
+def init_db():
+    """Create tables once per process"""
+    with db_connect() as conn:
+        # WAL lets editors keep reading boards while someone else is pinning
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS boards (
+            name TEXT PRIMARY KEY,
+            created TEXT NOT NULL)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS pinned_items (
+            id INTEGER PRIMARY KEY,
+            board TEXT NOT NULL REFERENCES boards(name),
+            title TEXT NOT NULL,
+            url TEXT NOT NULL,
+            type TEXT NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            added TEXT NOT NULL,
+            UNIQUE (board, url))""")
+        # UNIQUE (board, url) already indexes lookups by board; pages are ordered by id
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_pinned_items_board_type ON pinned_items(board, type)")
+        conn.execute("DROP INDEX IF EXISTS idx_pinned_items_board")
+        conn.execute("DROP INDEX IF EXISTS idx_pinned_items_added")
+        if conn.execute("SELECT COUNT(*) FROM boards").fetchone()[0] == 0:
+            now = datetime.now().strftime('%Y-%m-%d')
+            conn.executemany("INSERT INTO boards (name, created) VALUES (?, ?)", [(b, now) for b in DEFAULT_BOARDS])
+        conn.execute("""CREATE TABLE IF NOT EXISTS search_cache (
+            cache_key TEXT PRIMARY KEY,
+            query TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            results TEXT NOT NULL,
+            created REAL NOT NULL,
+            accessed REAL NOT NULL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache(accessed)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS search_history (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL DEFAULT '',
+            type TEXT NOT NULL,
+            query TEXT NOT NULL,
+            last_seen REAL NOT NULL)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS batch_jobs (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            board TEXT REFERENCES boards(name),
+            created REAL NOT NULL)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS batch_tasks (
+            id INTEGER PRIMARY KEY,
+            job_id INTEGER NOT NULL REFERENCES batch_jobs(id),
+            query TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            results TEXT,
+            error TEXT,
+            started REAL,
+            finished REAL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_tasks_job ON batch_tasks(job_id, status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_batch_tasks_status ON batch_tasks(status)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS link_status (
+            url TEXT PRIMARY KEY,
+            ok INTEGER NOT NULL,
+            state TEXT NOT NULL DEFAULT 'unverified',
+            status_code INTEGER,
+            final_url TEXT,
+            kind TEXT,
+            homepage_redirect INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            checked REAL NOT NULL)""")
+        if 'state' not in {row['name'] for row in conn.execute("PRAGMA table_info(link_status)")}:
+            # Rows from before ok/dead/unverified was tracked get rechecked once the short TTL passes
+            conn.execute("ALTER TABLE link_status ADD COLUMN state TEXT NOT NULL DEFAULT 'unverified'")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_link_status_checked ON link_status(checked)")
+        # Full-text indexes over pins and past results, kept current by triggers
+        for fts, table in (("pins_fts", "pinned_items"), ("history_fts", "search_history")):
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (fts,)).fetchone()
+            conn.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                title, description, url, type, content='{table}', content_rowid='id', tokenize='porter unicode61')""")
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, title, description, url, type) VALUES (new.id, new.title, new.description, new.url, new.type);
+            END""")
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, title, description, url, type) VALUES ('delete', old.id, old.title, old.description, old.url, old.type);
+            END""")
+            conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, title, description, url, type) VALUES ('delete', old.id, old.title, old.description, old.url, old.type);
+                INSERT INTO {fts}(rowid, title, description, url, type) VALUES (new.id, new.title, new.description, new.url, new.type);
+            END""")
+            if not exists:
+                # Index rows that were stored before the index existed
+                conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    return DB_PATH
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so trivial variations share a cache entry"""
+    return " ".join(query.lower().split())
+
+def cache_key(query, content_type):
+    return f"{content_type}:{normalize_query(query)}"
+
+def get_cached_results(query, content_type):
+    """Return cached results, or None when missing or expired"""
+    key = cache_key(query, content_type)
+    now = time.time()
+    with db_connect() as conn:
+        row = conn.execute("SELECT results, created FROM search_cache WHERE cache_key = ?", (key,)).fetchone()
+        if row is None:
+            get_metrics().increment("cache_requests_total", result="miss")
+            return None
+        if now - row['created'] > CACHE_TTL_SECONDS:
+            conn.execute("DELETE FROM search_cache WHERE cache_key = ?", (key,))
+            get_metrics().increment("cache_requests_total", result="expired")
+            return None
+        get_metrics().increment("cache_requests_total", result="hit")
+        conn.execute("UPDATE search_cache SET accessed = ? WHERE cache_key = ?", (now, key))
+    return json.loads(row['results'])
+
+def store_cached_results(query, content_type, results):
+    """Cache real AI results and evict least recently used entries past the size limit"""
+    now = time.time()
+    with db_connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO search_cache (cache_key, query, content_type, results, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+            (cache_key(query, content_type), normalize_query(query), content_type, json.dumps(results), now, now))
+        conn.execute(
+            "DELETE FROM search_cache WHERE cache_key NOT IN (SELECT cache_key FROM search_cache ORDER BY accessed DESC LIMIT ?)",
+            (CACHE_MAX_ENTRIES,))
+
+def invalidate_cache(query=None, content_type=None):
+    """Drop one cached search, or the whole cache when no query is given"""
+    with db_connect() as conn:
+        if query is None:
+            cur = conn.execute("DELETE FROM search_cache")
+        elif content_type is None:
+            cur = conn.execute("DELETE FROM search_cache WHERE query = ?", (normalize_query(query),))
+        else:
+            cur = conn.execute("DELETE FROM search_cache WHERE cache_key = ?", (cache_key(query, content_type),))
+        return cur.rowcount
+
+def list_boards():
+    with db_connect() as conn:
+        return [row['name'] for row in conn.execute("SELECT name FROM boards ORDER BY created, rowid")]
+
+def create_board(name):
+    """Add a board; returns False if it already exists"""
+    with db_connect() as conn:
+        cur = conn.execute("INSERT OR IGNORE INTO boards (name, created) VALUES (?, ?)", (name, datetime.now().strftime('%Y-%m-%d')))
+        return cur.rowcount > 0
+
+def pin_items(board, items):
+    """Pin items to a board in one transaction; URLs already on the board are skipped"""
+    added = datetime.now().strftime('%Y-%m-%d')
+    # Model output can omit a title; fall back to the URL like the result cards do
+    rows = [(board, item.get('title') or item['url'], item['url'], item.get('type', 'article'), item.get('description', ''), added)
+            for item in items]
+    with db_connect() as conn:
+        # rowcount, unlike total_changes, leaves out the rows written by the full-text index triggers
+        return conn.executemany(
+            "INSERT OR IGNORE INTO pinned_items (board, title, url, type, description, added) VALUES (?, ?, ?, ?, ?, ?)",
+            rows).rowcount
+
+def count_board_items(board):
+    with db_connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM pinned_items WHERE board = ?", (board,)).fetchone()[0]
+
+def load_board_items(board, limit, offset=0):
+    """One page of a board's pins, in the order they were added"""
+    with db_connect() as conn:
+        rows = conn.execute(
+            "SELECT title, url, type, description, added FROM pinned_items WHERE board = ? ORDER BY id LIMIT ? OFFSET ?",
+            (board, limit, offset)).fetchall()
+    return [dict(row) for row in rows]
+
+LIBRARY_TYPES = {"images": "image", "articles": "article", "videos": "video", "pdfs": "pdf"}
+
+def record_search_history(query, results):
+    """Remember real search results so the library can find them again"""
+    now = time.time()
+    rows = [(r['url'], r.get('title', r['url']), r.get('description', ''), r.get('type', 'article'), query, now) for r in results]
+    with db_connect() as conn:
+        conn.executemany(
+            """INSERT INTO search_history (url, title, description, type, query, last_seen) VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(url) DO UPDATE SET title = excluded.title, description = excluded.description,
+                   type = excluded.type, query = excluded.query, last_seen = excluded.last_seen""",
+            rows)
+
+def library_match_expression(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix"""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{w}"' for w in words[:-1]) + f' "{words[-1]}"*'
+
+def search_library(text, content_type="all", limit=50):
+    """Ranked full-text search over pinned items and past results, one entry per URL"""
+    match = library_match_expression(text)
+    if match is None:
+        return []
+    type_filter, params = "", [match, match]
+    if content_type in LIBRARY_TYPES:
+        type_filter, params = "WHERE type = ?", params + [LIBRARY_TYPES[content_type]]
+    # Titles weigh most, then descriptions; lower bm25 is better
+    with db_connect() as conn:
+        rows = conn.execute(f"""
+            SELECT * FROM (
+                SELECT p.title, p.url, p.type, p.description, p.board, NULL AS query, bm25(pins_fts, 10.0, 3.0, 1.0, 1.0) AS rank
+                FROM pins_fts JOIN pinned_items p ON p.id = pins_fts.rowid WHERE pins_fts MATCH ?
+                UNION ALL
+                SELECT h.title, h.url, h.type, h.description, NULL, h.query, bm25(history_fts, 10.0, 3.0, 1.0, 1.0)
+                FROM history_fts JOIN search_history h ON h.id = history_fts.rowid WHERE history_fts MATCH ?
+            ) {type_filter} ORDER BY rank LIMIT ?""", params + [limit * 2]).fetchall()
+    
+    hits = {}
+    for row in rows:
+        hit = hits.setdefault(row['url'], {
+            'id': f"lib{len(hits) + 1}", 'title': row['title'], 'url': row['url'], 'type': row['type'],
+            'description': row['description'], 'boards': [], 'query': None})
+        if row['board'] and row['board'] not in hit['boards']:
+            hit['boards'].append(row['board'])
+        hit['query'] = hit['query'] or row['query']
+    return list(hits.values())[:limit]
+
+init_db()
+
+SEARCH_MODEL = "claude-sonnet-4-20250514"
+API_TIMEOUT_SECONDS = float(os.environ.get("INDELIBLE_API_TIMEOUT_SECONDS", 120))
+API_MAX_RETRIES = int(os.environ.get("INDELIBLE_API_MAX_RETRIES", 4))
+API_BACKOFF_BASE_SECONDS = float(os.environ.get("INDELIBLE_API_BACKOFF_BASE_SECONDS", 1.0))
+API_BACKOFF_MAX_SECONDS = float(os.environ.get("INDELIBLE_API_BACKOFF_MAX_SECONDS", 30))
+API_REQUESTS_PER_MINUTE = float(os.environ.get("INDELIBLE_API_REQUESTS_PER_MINUTE", 50))
+API_BURST = int(os.environ.get("INDELIBLE_API_BURST", 5))
+# Total time one search may spend across all its attempts and backoff sleeps
+API_RETRY_BUDGET_SECONDS = float(os.environ.get("INDELIBLE_API_RETRY_BUDGET_SECONDS", 180))
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until another request may be sent"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+@st.cache_resource
+def get_rate_limiter():
+    """One limiter per process, shared by every session and worker thread"""
+    return TokenBucket(API_REQUESTS_PER_MINUTE / 60, API_BURST)
+
+@st.cache_resource
+def get_client():
+    """Process-wide Anthropic client so searches reuse its pooled keep-alive connections"""
+    import anthropic
+    
+    return anthropic.Anthropic(
+        api_key=os.environ.get("ANTHROPIC_API_KEY"),
+        timeout=API_TIMEOUT_SECONDS,
+        # Retries are handled by with_retries so they also go through the rate limiter
+        max_retries=0,
+    )
+
+def is_retryable(error):
+    """Connection errors, timeouts, rate limits and overloaded/5xx responses are worth another try"""
+    import anthropic
+    
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and error.status_code in RETRYABLE_STATUS_CODES
+
+def retry_delay(attempt, error):
+    """Honor retry-after when the API sends one, otherwise exponential backoff with full jitter"""
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    try:
+        return min(float(retry_after), API_BACKOFF_MAX_SECONDS)
+    except (TypeError, ValueError):
+        return random.uniform(0, min(API_BACKOFF_MAX_SECONDS, API_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+def attempt_timeout(deadline):
+    """Request timeout for the next attempt, cut short so it ends by the retry budget's deadline"""
+    return max(1.0, min(API_TIMEOUT_SECONDS, deadline - time.monotonic()))
+
+def next_retry_delay(attempt, error, deadline):
+    """Seconds to wait before retrying, or None when the error is final or the budget is spent"""
+    if attempt >= API_MAX_RETRIES or not is_retryable(error):
+        return None
+    delay = retry_delay(attempt, error)
+    if time.monotonic() + delay >= deadline:
+        get_metrics().increment("api_retry_budget_exhausted_total")
+        return None
+    get_metrics().increment("api_retries_total", error=type(error).__name__)
+    return delay
+
+def with_retries(call, deadline=None):
+    """Run call(timeout=...) behind the shared rate limiter, retrying transient API errors within the retry budget"""
+    # A caller's deadline (such as the "all" fan-out's) can only shorten the budget
+    deadline = min(deadline or float("inf"), time.monotonic() + API_RETRY_BUDGET_SECONDS)
+    for attempt in itertools.count():
+        get_rate_limiter().acquire()
+        try:
+            return call(timeout=attempt_timeout(deadline))
+        except Exception as e:
+            delay = next_retry_delay(attempt, e, deadline)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+def build_search_request(query, content_type):
+    """Messages API arguments for a web search restricted to one content type"""
+    # Customize search instruction based on content type
+    if content_type == "all":
+        type_instruction = "Find 15 diverse sources: mix of articles, images, videos, and PDFs."
+    elif content_type == "images":
+        type_instruction = "Find 15 IMAGE sources only. Look for: photo archives, museum collections, Pinterest boards, Flickr albums, historical image databases, Google Images results."
+    elif content_type == "articles":
+        type_instruction = "Find 15 ARTICLE sources only. Look for: historical articles, blog posts, encyclopedia entries, news archives, educational websites."
+    elif content_type == "videos":
+        type_instruction = "Find 15 VIDEO sources only. Look for: YouTube videos, documentaries, educational channels, PBS content, historical footage archives."
+    elif content_type == "pdfs":
+        type_instruction = "Find 15 PDF DOCUMENT sources only. Look for: research papers on Google Scholar, academic journals, historical documents, museum reports."
+    
+    return dict(
+        model=SEARCH_MODEL,
+        max_tokens=4000,
+        tools=[{
+            "type": "web_search_20250305",
+            "name": "web_search"
+        }],
+        messages=[{
+            "role": "user",
+            "content": f"""Search the web for: "{query}"
 
 {type_instruction}
 
@@ -62,40 +536,308 @@ Return ONLY a valid JSON array (no markdown, no preamble, no explanation):
 ]
 
 Use the web_search tool to find REAL, WORKING, DIRECT URLs. Double-check that URLs are complete and specific."""
-            }]
-        )
-        
+        }]
+    )
+
+JSON_SPECIAL_CHARS = re.compile(r'[][{}"\\]')
+JSON_DECODER = json.JSONDecoder()
+
+class JSONArrayStreamParser:
+    """Pull complete objects out of a JSON array as its text arrives in chunks.
+
+    Jumps between structural characters, tracking brace depth and string
+    state, so it stays linear on long responses and ignores any preamble or
+    code fences around the array. Objects that are already complete when
+    they start are decoded in one raw_decode call. `closed` turns true once
+    the array's closing bracket arrives, so a response cut short (for
+    example at max_tokens) can be told apart from a complete one.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.start = None
+        self.depth = 0
+        self.in_array = False
+        self.in_string = False
+        self.escaped = False
+        self.closed = False
+
+    def feed(self, text):
+        """Add text and return the objects it completed"""
+        self.buffer += text
+        buf = self.buffer
+        objects = []
+        i = self.pos
+        if self.escaped and i < len(buf):
+            # The previous chunk ended on a backslash inside a string
+            self.escaped = False
+            i += 1
+        while True:
+            match = JSON_SPECIAL_CHARS.search(buf, i)
+            if match is None:
+                i = len(buf)
+                break
+            i = match.start()
+            ch = buf[i]
+            if self.in_string:
+                if ch == '\\':
+                    if i + 1 >= len(buf):
+                        self.escaped = True
+                        i += 1
+                        break
+                    i += 1
+                elif ch == '"':
+                    self.in_string = False
+            elif self.depth == 0:
+                if ch == '[':
+                    self.in_array = True
+                    self.closed = False
+                elif ch == ']' and self.in_array:
+                    self.in_array = False
+                    self.closed = True
+                elif ch == '{' and self.in_array:
+                    try:
+                        obj, end = JSON_DECODER.raw_decode(buf, i)
+                        objects.append(obj)
+                        i = end
+                        continue
+                    except ValueError:
+                        # Not finished yet (or malformed); track it brace by brace
+                        self.depth = 1
+                        self.start = i
+            elif ch == '"':
+                self.in_string = True
+            elif ch == '{':
+                self.depth += 1
+            elif ch == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        objects.append(json.loads(buf[self.start:i + 1]))
+                    except ValueError:
+                        pass
+                    self.start = None
+            i += 1
+        # Keep only the unfinished object so the buffer doesn't grow with the response
+        if self.start is None:
+            self.buffer, self.pos = "", 0
+        else:
+            self.buffer, self.pos = buf[self.start:], i - self.start
+            self.start = 0
+        return objects
+
+def extract_json_results(response_text):
+    """Parse every source object out of a complete model response"""
+    return JSONArrayStreamParser().feed(response_text)
+
+def response_complete(parser, message):
+    """Whether the model finished its array, rather than stopping at max_tokens or mid-object"""
+    return parser.closed and getattr(message, 'stop_reason', None) != "max_tokens"
+
+def clean_result(r, index):
+    """Ensure a result has an id, a singular type and an absolute URL"""
+    if 'id' not in r:
+        r['id'] = str(index + 1)
+    # The prompt asks for the content type name, which is plural
+    r['type'] = {'images': 'image', 'articles': 'article', 'videos': 'video', 'pdfs': 'pdf'}.get(r.get('type'), r.get('type', 'article'))
+    # Basic URL validation
+    if not r.get('url', '').startswith('http'):
+        r['url'] = 'https://' + r.get('url', '')
+    return r
+
+def fetch_ai_results(query, content_type, deadline=None):
+    """One uncached web search round trip; raises when no usable results come back"""
+    request = build_search_request(query, content_type)
+    with timed("api_call", content_type=content_type):
+        message = with_retries(lambda timeout: get_client().messages.create(**request, timeout=timeout), deadline)
+    record_usage(content_type, message.usage)
+    
+    with timed("parse", content_type=content_type):
         # Extract and parse response
         response_text = ""
         for block in message.content:
             if block.type == "text":
                 response_text += block.text
         
-        # Clean and parse JSON
-        response_text = response_text.strip().replace("```json", "").replace("```", "")
-        import re
-        json_match = re.search(r'\[\s*\{[\s\S]*\}\s*\]', response_text)
+        parser = JSONArrayStreamParser()
+        results = [clean_result(r, i) for i, r in enumerate(parser.feed(response_text))]
+    if len(results) > 0:
+        return results, response_complete(parser, message)
+    else:
+        raise Exception("Could not parse JSON response")
+
+def cached_ai_search(query, content_type, refresh=False, deadline=None):
+    """Real results from the cache or a fresh search, and whether they are complete; never falls back to demo results"""
+    start = time.perf_counter()
+    if not refresh:
+        cached = get_cached_results(query, content_type)
+        if cached:
+            record_search(content_type, "cache", (time.perf_counter() - start) * 1000, len(cached))
+            return cached, True
+    try:
+        results, complete = fetch_ai_results(query, content_type, deadline)
+    except Exception:
+        record_search(content_type, "error", (time.perf_counter() - start) * 1000)
+        raise
+    if not complete:
+        # Show what arrived, but don't cache a truncated answer or index it as a past result
+        record_search(content_type, "partial", (time.perf_counter() - start) * 1000, len(results))
+        return results, False
+    store_cached_results(query, content_type, results)
+    record_search_history(query, results)
+    record_search(content_type, "ai", (time.perf_counter() - start) * 1000, len(results))
+    return results, True
+
+def add_search_notice(message):
+    """Warn about the current results in a way that survives the rerun that draws them"""
+    st.session_state.setdefault('search_notices', []).append(message)
+
+def search_with_ai(query, content_type, refresh=False):
+    """Real AI-powered web search with content type filtering, served from the cache when possible"""
+    if content_type == "all":
+        return list(iter_all_types(query, refresh=refresh))
+    try:
+        results, complete = cached_ai_search(query, content_type, refresh=refresh)
+    except Exception as e:
+        record_fallback(content_type)
+        add_search_notice(f"AI search encountered an issue. Showing curated {content_type} results instead.")
+        return generate_demo_results(query, content_type)
+    if not complete:
+        add_search_notice("AI search was interrupted. Showing the sources found so far.")
+    return results
+
+ALL_TYPES_QUOTA = {"articles": 5, "images": 4, "videos": 3, "pdfs": 3}
+ALL_TYPES_CONCURRENCY = int(os.environ.get("INDELIBLE_ALL_TYPES_CONCURRENCY", 4))
+# Defaults to the retry budget so a branch that needs a retry isn't replaced by demo results
+ALL_TYPES_TIMEOUT_SECONDS = float(os.environ.get("INDELIBLE_ALL_TYPES_TIMEOUT_SECONDS", API_RETRY_BUDGET_SECONDS))
+
+def iter_all_types(query, refresh=False):
+    """Search every content type concurrently and yield a deduplicated mix as each branch finishes.
+
+    Each type contributes at most its ALL_TYPES_QUOTA share. A branch that
+    fails or misses the deadline is replaced by demo results for that type
+    only, so the others still show real sources. Branches share the
+    deadline, so one that misses it stops retrying instead of spending
+    API calls on an answer nobody will see.
+    """
+    seen_urls = set()
+    failed = []
+    partial = []
+    count = 0
+    
+    def merge(branch_results, quota):
+        nonlocal count
+        taken = 0
+        for r in branch_results:
+            url_key = r['url'].rstrip('/').lower()
+            if taken >= quota or url_key in seen_urls:
+                continue
+            seen_urls.add(url_key)
+            taken += 1
+            count += 1
+            yield dict(r, id=str(count))
+    
+    with timed("fanout", content_type="all"):
+        # Workers share the session's script context so cached resources resolve without warnings
+        ctx = get_script_run_ctx()
+        executor = ThreadPoolExecutor(max_workers=ALL_TYPES_CONCURRENCY, initializer=lambda: add_script_run_ctx(ctx=ctx))
+        deadline = time.monotonic() + ALL_TYPES_TIMEOUT_SECONDS
+        futures = {executor.submit(cached_ai_search, query, t, refresh, deadline): t for t in ALL_TYPES_QUOTA}
+        try:
+            for future in as_completed(futures, timeout=ALL_TYPES_TIMEOUT_SECONDS):
+                content_type = futures.pop(future)
+                try:
+                    branch_results, complete = future.result()
+                    if not complete:
+                        partial.append(content_type)
+                except Exception:
+                    failed.append(content_type)
+                    record_fallback(content_type)
+                    branch_results = generate_demo_results(query, content_type)
+                yield from merge(branch_results, ALL_TYPES_QUOTA[content_type])
+        except FuturesTimeoutError:
+            for content_type in futures.values():
+                failed.append(content_type)
+                # The branch gives up at the shared deadline and records its own outcome then
+                record_fallback(content_type)
+                yield from merge(generate_demo_results(query, content_type), ALL_TYPES_QUOTA[content_type])
+        finally:
+            # Don't wait on branches that missed the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    if failed:
+        add_search_notice(f"AI search for {', '.join(sorted(failed))} encountered an issue. Showing curated results for those types instead.")
+    if partial:
+        add_search_notice(f"AI search for {', '.join(sorted(partial))} was interrupted. Showing the sources found so far for those types.")
+
+def stream_search_with_ai(query, content_type, refresh=False):
+    """Like search_with_ai, but yields each source as soon as the model finishes writing it"""
+    if content_type == "all":
+        yield from iter_all_types(query, refresh=refresh)
+        return
+    start = time.perf_counter()
+    if not refresh:
+        cached = get_cached_results(query, content_type)
+        if cached:
+            record_search(content_type, "cache", (time.perf_counter() - start) * 1000, len(cached))
+            yield from cached
+            return
+    results = []
+    try:
+        request = build_search_request(query, content_type)
+        deadline = time.monotonic() + API_RETRY_BUDGET_SECONDS
+        for attempt in itertools.count():
+            get_rate_limiter().acquire()
+            parser = JSONArrayStreamParser()
+            try:
+                with get_client().messages.stream(**request, timeout=attempt_timeout(deadline)) as stream:
+                    search_started = None
+                    for event in stream:
+                        if event.type == "content_block_start":
+                            # Time between the tool call and its result is spent inside web_search
+                            if event.content_block.type == "server_tool_use":
+                                search_started = time.perf_counter()
+                            elif event.content_block.type == "web_search_tool_result" and search_started is not None:
+                                record_span("web_search", (time.perf_counter() - search_started) * 1000, content_type=content_type)
+                                search_started = None
+                        elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                            for r in parser.feed(event.delta.text):
+                                if not results:
+                                    record_span("first_result", (time.perf_counter() - start) * 1000, content_type=content_type)
+                                result = clean_result(r, len(results))
+                                results.append(result)
+                                yield result
+                    final_message = stream.get_final_message()
+                    record_usage(content_type, final_message.usage)
+                break
+            except Exception as e:
+                # Once sources have been shown, a retry would duplicate them
+                delay = None if results else next_retry_delay(attempt, e, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
         
-        if json_match:
-            results = json.loads(json_match.group(0))
-            # Ensure each has an id and validate URLs
-            for i, r in enumerate(results):
-                if 'id' not in r:
-                    r['id'] = str(i + 1)
-                # Basic URL validation
-                if not r.get('url', '').startswith('http'):
-                    r['url'] = 'https://' + r.get('url', '')
-            
-            if len(results) > 0:
-                return results
-            else:
-                raise Exception("No results returned")
+        if results and not response_complete(parser, final_message):
+            # Handled below like an interrupted stream: keep the sources, don't cache them
+            raise Exception("Response ended before the JSON array closed")
+        if len(results) > 0:
+            store_cached_results(query, content_type, results)
+            record_search_history(query, results)
+            record_search(content_type, "ai", (time.perf_counter() - start) * 1000, len(results))
         else:
             raise Exception("Could not parse JSON response")
             
-    except Exception as e:
-        st.warning(f"AI search encountered an issue. Showing curated {content_type} results instead.")
-        return generate_demo_results(query, content_type)
+    except Exception:
+        if results:
+            # Keep what already arrived, but don't cache a truncated answer
+            record_search(content_type, "partial", (time.perf_counter() - start) * 1000, len(results))
+            add_search_notice("AI search was interrupted. Showing the sources found so far.")
+        else:
+            record_search(content_type, "error", (time.perf_counter() - start) * 1000)
+            record_fallback(content_type)
+            add_search_notice(f"AI search encountered an issue. Showing curated {content_type} results instead.")
+            yield from generate_demo_results(query, content_type)
 
 def generate_demo_results(query, content_type):
     """Fallback demo results with realistic direct URLs"""
@@ -179,97 +921,724 @@ def generate_demo_results(query, content_type):
     else:
         return all_results.get(content_type, all_results["articles"])
 
-with st.sidebar:
-    st.title("🎬 Indelible Frame")
-    st.divider()
+BATCH_CONCURRENCY = int(os.environ.get("INDELIBLE_BATCH_CONCURRENCY", 3))
+BATCH_POLL_SECONDS = float(os.environ.get("INDELIBLE_BATCH_POLL_SECONDS", 3))
+BATCH_STALE_SECONDS = float(os.environ.get("INDELIBLE_BATCH_STALE_SECONDS", 15 * 60))
+BATCH_CONTENT_TYPES = ["images", "articles", "videos", "pdfs"]
+
+BACKGROUND_THREAD_PREFIXES = ("batch", "linkcheck")
+
+class BackgroundThreadFilter(logging.Filter):
+    """Drop Streamlit's missing-context warnings from the process-wide worker pools"""
+
+    def filter(self, record):
+        return not record.threadName.startswith(BACKGROUND_THREAD_PREFIXES)
+
+@st.cache_resource
+def quiet_background_threads():
+    """Shared workers serve every session, so they run without any one session's script context"""
+    logging.getLogger(get_script_run_ctx.__module__).addFilter(BackgroundThreadFilter())
+
+@st.cache_resource
+def get_batch_executor():
+    """Process-wide worker pool for batch research; picks up tasks a previous process left unfinished"""
+    quiet_background_threads()
+    executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="batch")
+    with db_connect() as conn:
+        pending = [row['id'] for row in conn.execute("SELECT id FROM batch_tasks WHERE status = 'queued' ORDER BY id")]
+    for task_id in pending:
+        executor.submit(run_batch_task, task_id)
+    requeue_stale_batch_tasks(executor)
+    return executor
+
+def requeue_stale_batch_tasks(executor=None):
+    """Hand tasks left 'running' past BATCH_STALE_SECONDS (their worker died) back to the pool"""
+    with db_connect() as conn:
+        stale = [row['id'] for row in conn.execute("SELECT id FROM batch_tasks WHERE status = 'running' AND started < ?",
+                                                   (time.time() - BATCH_STALE_SECONDS,))]
+        requeued = [task_id for task_id in stale if conn.execute(
+            "UPDATE batch_tasks SET status = 'queued', started = NULL WHERE id = ? AND status = 'running'", (task_id,)).rowcount]
+    executor = executor or get_batch_executor()
+    for task_id in requeued:
+        executor.submit(run_batch_task, task_id)
+    return len(requeued)
+
+def submit_batch(name, queries, content_types, board=None):
+    """Queue every query x content type pair as one job; returns the job id"""
+    with db_connect() as conn:
+        job_id = conn.execute("INSERT INTO batch_jobs (name, board, created) VALUES (?, ?, ?)", (name, board, time.time())).lastrowid
+        conn.executemany("INSERT INTO batch_tasks (job_id, query, content_type) VALUES (?, ?, ?)",
+                         [(job_id, q, t) for q in queries for t in content_types])
+        task_ids = [row['id'] for row in conn.execute("SELECT id FROM batch_tasks WHERE job_id = ? ORDER BY id", (job_id,))]
+    executor = get_batch_executor()
+    for task_id in task_ids:
+        executor.submit(run_batch_task, task_id)
+    return job_id
+
+def run_batch_task(task_id):
+    """Search for one task and store the outcome; auto-pins to the job's board when it has one"""
+    with db_connect() as conn:
+        # Claim the task so a resumed or duplicate submission can't run it twice
+        if conn.execute("UPDATE batch_tasks SET status = 'running', started = ? WHERE id = ? AND status = 'queued'",
+                        (time.time(), task_id)).rowcount == 0:
+            return
+        task = conn.execute("""SELECT t.query, t.content_type, j.board FROM batch_tasks t JOIN batch_jobs j ON j.id = t.job_id
+                               WHERE t.id = ?""", (task_id,)).fetchone()
+    try:
+        # Goes through the cache, the shared rate limiter and the retry policy like any other search
+        (results, _), status, error = cached_ai_search(task['query'], task['content_type']), 'done', None
+    except Exception as e:
+        results, status, error = [], 'failed', str(e)[:500]
+    with db_connect() as conn:
+        conn.execute("UPDATE batch_tasks SET status = ?, results = ?, error = ?, finished = ? WHERE id = ?",
+                     (status, json.dumps(results), error, time.time(), task_id))
+    if results and task['board']:
+        pin_items(task['board'], results)
+    if results:
+        queue_link_checks([r['url'] for r in results])
+
+def list_batch_jobs(limit=10):
+    """Most recent jobs with their task counts by status"""
+    with db_connect() as conn:
+        rows = conn.execute("""
+            SELECT j.id, j.name, j.board, j.created, COUNT(t.id) AS total,
+                   SUM(t.status = 'done') AS done, SUM(t.status = 'failed') AS failed, SUM(t.status = 'running') AS running
+            FROM batch_jobs j JOIN batch_tasks t ON t.job_id = j.id
+            GROUP BY j.id ORDER BY j.id DESC LIMIT ?""", (limit,)).fetchall()
+    return [dict(row) for row in rows]
+
+def load_batch_tasks(job_id):
+    """Per-task status for one job, with result counts rather than the results themselves"""
+    with db_connect() as conn:
+        rows = conn.execute("""SELECT query, content_type, status, COALESCE(json_array_length(results), 0) AS results, error
+                               FROM batch_tasks WHERE job_id = ? ORDER BY id""", (job_id,)).fetchall()
+    return [dict(row) for row in rows]
+
+def pin_batch_results(job_id, board):
+    """Pin every finished result of a job to a board in one transaction"""
+    with db_connect() as conn:
+        rows = conn.execute("SELECT results FROM batch_tasks WHERE job_id = ? AND status = 'done'", (job_id,)).fetchall()
+    return pin_items(board, [r for row in rows for r in json.loads(row['results'])])
+
+LINK_TTL_SECONDS = int(os.environ.get("INDELIBLE_LINK_TTL_SECONDS", 24 * 3600))
+# Blocked, rate-limited and unreachable links are retried much sooner than settled ones
+LINK_UNVERIFIED_TTL_SECONDS = int(os.environ.get("INDELIBLE_LINK_UNVERIFIED_TTL_SECONDS", 15 * 60))
+LINK_CONCURRENCY = int(os.environ.get("INDELIBLE_LINK_CONCURRENCY", 10))
+LINK_TIMEOUT_SECONDS = float(os.environ.get("INDELIBLE_LINK_TIMEOUT_SECONDS", 10))
+LINK_POLL_SECONDS = float(os.environ.get("INDELIBLE_LINK_POLL_SECONDS", 2))
+# Only for local testing; the model can return any URL, so by default it may not reach internal hosts.
+# Each host is resolved once and the connection goes to the address that was checked, so a DNS answer
+# that changes between the check and the connect (rebinding) can't redirect it to an internal host.
+LINK_ALLOW_PRIVATE_HOSTS = os.environ.get("INDELIBLE_LINK_ALLOW_PRIVATE_HOSTS", "") == "1"
+# Off for the offline benchmark, whose AppTest reruns would otherwise check links over the network
+LINK_BACKGROUND_CHECKS = os.environ.get("INDELIBLE_LINK_BACKGROUND_CHECKS", "1") == "1"
+# Servers that refuse HEAD answer with one of these; a GET tells us the truth
+HEAD_UNSUPPORTED_STATUS_CODES = {403, 405, 501}
+# Only these mean the content is gone; 401/403/429 and the like usually mean a bot was turned away
+DEAD_STATUS_CODES = {404, 410}
+
+def classify_content_type(content_type, url):
+    """Map a Content-Type header (or, failing that, the URL's extension) to image/pdf/video/html/other"""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type.startswith("image/"):
+        return "image"
+    if content_type == "application/pdf":
+        return "pdf"
+    if content_type.startswith("video/"):
+        return "video"
+    if content_type in ("text/html", "application/xhtml+xml"):
+        return "html"
+    path = url.split("?")[0].lower()
+    for kind, extensions in (("image", (".jpg", ".jpeg", ".png", ".gif", ".webp", ".tif", ".tiff")), ("pdf", (".pdf",)),
+                             ("video", (".mp4", ".webm", ".mov"))):
+        if path.endswith(extensions):
+            return kind
+    return "other"
+
+def is_homepage_redirect(url, final_url):
+    """A deep link that lands on the site root usually means the content is gone"""
+    import httpx
     
-    board = st.selectbox("Project Boards", st.session_state.boards)
-    st.session_state.current_board = board
+    original, final = httpx.URL(url), httpx.URL(final_url)
+    return original.path.strip("/") != "" and final.path.strip("/") == "" and not final.query
+
+async def resolve_public_address(host, port):
+    """One address for host, refusing loopback, private, link-local and other non-public ones"""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+    if not LINK_ALLOW_PRIVATE_HOSTS:
+        for address in addresses:
+            if not address.is_global or address.is_multicast:
+                raise ValueError(f"{host} is not a public address ({address})")
+    return str(addresses[0])
+
+def pinned_transport(**kwargs):
+    """httpx transport that connects every request, redirect hops included, to the address resolve_public_address checked"""
+    import httpx
     
-    new = st.text_input("New board name")
-    if st.button("Create") and new:
-        if new not in st.session_state.boards:
-            st.session_state.boards.append(new)
-            st.rerun()
+    class PinnedAddressTransport(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self.transport = httpx.AsyncHTTPTransport(**kwargs)
+        
+        async def handle_async_request(self, request):
+            url = request.url
+            address = await resolve_public_address(url.host, url.port or (443 if url.scheme == "https" else 80))
+            # The Host header and TLS server name keep the original host, so virtual hosting and certificates still work
+            pinned = httpx.Request(request.method, url.copy_with(host=address), headers=request.headers, stream=request.stream,
+                                   extensions={**request.extensions, "sni_hostname": url.host})
+            return await self.transport.handle_async_request(pinned)
+        
+        async def aclose(self):
+            await self.transport.aclose()
     
-    if st.session_state.selected_items:
-        st.write(f"**{len(st.session_state.selected_items)} selected**")
-        st.write("Pin to board:")
-        for b in st.session_state.boards:
-            if st.button(f"📌 {b}", key=f"pin_{b}"):
-                items = [r for r in st.session_state.search_results if r['id'] in st.session_state.selected_items]
-                if b not in st.session_state.pinned_items:
-                    st.session_state.pinned_items[b] = []
-                for item in items:
-                    st.session_state.pinned_items[b].append({
-                        'title': item['title'], 'url': item['url'], 'type': item['type'],
-                        'description': item.get('description', ''), 'added': datetime.now().strftime('%Y-%m-%d')
-                    })
-                st.session_state.selected_items.clear()
-                st.success(f"Pinned {len(items)} items!")
-                st.rerun()
+    return PinnedAddressTransport()
 
-tab1, tab2 = st.tabs(["🔍 Search", f"📋 {st.session_state.current_board}"])
+def link_error_status(url, error):
+    """Status row for a URL that couldn't be checked at all; only an unknown host counts as dead"""
+    unknown_host = isinstance(error, socket.gaierror) and error.errno == socket.EAI_NONAME
+    return {'url': url, 'ok': False, 'state': 'dead' if unknown_host else 'unverified', 'status_code': None, 'final_url': None,
+            'kind': None, 'homepage_redirect': False, 'error': f"{type(error).__name__}: {error}"[:300]}
 
-with tab1:
-    st.title("AI Research Search")
-    
-    col1, col2 = st.columns([3, 1])
+def link_state(status_code):
+    """ok, dead or unverified for the final response; 5xx only gets here when the GET fallback failed too"""
+    if status_code < 400:
+        return 'ok'
+    if status_code in DEAD_STATUS_CODES or status_code >= 500:
+        return 'dead'
+    return 'unverified'
+
+async def check_link(client, url):
+    """HEAD the URL (GET when HEAD isn't supported), following redirects to the final resource"""
+    try:
+        response = await client.head(url)
+        if response.status_code in HEAD_UNSUPPORTED_STATUS_CODES or response.status_code >= 500:
+            # Stream so only the headers are read, not the whole image or PDF
+            async with client.stream("GET", url) as response:
+                pass
+        final_url = str(response.url)
+        state = link_state(response.status_code)
+        return {
+            'url': url,
+            'ok': state == 'ok',
+            'state': state,
+            'status_code': response.status_code,
+            'final_url': final_url,
+            'kind': classify_content_type(response.headers.get("content-type"), final_url),
+            'homepage_redirect': final_url != url and is_homepage_redirect(url, final_url),
+            'error': None,
+        }
+    except Exception as e:
+        # Model-returned URLs can be malformed in ways httpx reports outside HTTPError (InvalidURL)
+        return link_error_status(url, e)
+
+async def check_links_async(urls):
+    """Check URLs concurrently through one client whose pool caps open connections"""
+    import httpx
     
+    limits = httpx.Limits(max_connections=LINK_CONCURRENCY, max_keepalive_connections=LINK_CONCURRENCY)
+    async with httpx.AsyncClient(transport=pinned_transport(limits=limits), timeout=LINK_TIMEOUT_SECONDS, follow_redirects=True,
+                                 headers={"User-Agent": "IndelibleFrame-LinkCheck/1.0"}) as client:
+        checked = await asyncio.gather(*(check_link(client, url) for url in urls), return_exceptions=True)
+    # One bad URL must never cost the rest of the batch its results
+    checked = [link_error_status(url, status) if isinstance(status, BaseException) else status for url, status in zip(urls, checked)]
+    if not any(status['status_code'] for status in checked):
+        # Nothing answered at all: more likely our network or DNS is down than every host being gone
+        for status in checked:
+            status['state'] = 'unverified'
+    return checked
+
+def get_link_statuses(urls):
+    """Cached statuses that are still within the TTL, keyed by URL; never touches the network"""
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    with db_connect() as conn:
+        rows = conn.execute(f"""SELECT * FROM link_status WHERE url IN ({','.join('?' * len(urls))})
+                                 AND checked >= CASE state WHEN 'unverified' THEN ? ELSE ? END""",
+                            urls + [time.time() - LINK_UNVERIFIED_TTL_SECONDS, time.time() - LINK_TTL_SECONDS]).fetchall()
+    return {row['url']: dict(row) for row in rows}
+
+def check_links(urls, refresh=False):
+    """Statuses for every URL, checking only those missing from the status index or past the TTL"""
+    urls = list(dict.fromkeys(urls))
+    statuses = {} if refresh else get_link_statuses(urls)
+    stale = [url for url in urls if url not in statuses]
+    if stale:
+        with timed("link_check", fields={"items": len(stale)}):
+            checked = asyncio.run(check_links_async(stale))
+        now = time.time()
+        with db_connect() as conn:
+            conn.executemany(
+                """INSERT OR REPLACE INTO link_status (url, ok, state, status_code, final_url, kind, homepage_redirect, error, checked)
+                   VALUES (:url, :ok, :state, :status_code, :final_url, :kind, :homepage_redirect, :error, :checked)""",
+                [dict(status, checked=now) for status in checked])
+        get_metrics().increment("links_checked_total", len(checked))
+        get_metrics().increment("dead_links_total", sum(status['state'] == 'dead' for status in checked))
+        get_metrics().increment("unverified_links_total", sum(status['state'] == 'unverified' for status in checked))
+        statuses.update((status['url'], status) for status in checked)
+    return statuses
+
+class LinkCheckQueue:
+    """Background link checks shared by every session; a URL already being checked isn't queued again"""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="linkcheck")
+        self.lock = threading.Lock()
+        self.in_flight = set()
+
+    def submit(self, urls):
+        with self.lock:
+            urls = [url for url in dict.fromkeys(urls) if url not in self.in_flight]
+            self.in_flight.update(urls)
+        if urls:
+            self.executor.submit(check_links, urls).add_done_callback(lambda _: self.release(urls))
+
+    def release(self, urls):
+        with self.lock:
+            self.in_flight.difference_update(urls)
+
+    def pending(self, urls):
+        with self.lock:
+            return not self.in_flight.isdisjoint(urls)
+
+@st.cache_resource
+def get_link_queue():
+    """Process-wide queue so freshly returned results are checked without blocking the page"""
+    quiet_background_threads()
+    return LinkCheckQueue()
+
+def queue_link_checks(urls):
+    if LINK_BACKGROUND_CHECKS:
+        get_link_queue().submit(urls)
+
+def link_poll_interval(flag, urls):
+    """run_every for a view's fragment: poll only while link checks for urls are running.
+
+    Called on full runs, before the fragment is drawn; session_state[flag]
+    remembers whether this render's timer is on for poll_link_checks.
+    """
+    pending = get_link_queue().pending(urls)
+    st.session_state[flag] = pending
+    st.session_state[f"{flag}_full_run"] = True
+    return LINK_POLL_SECONDS if pending else None
+
+def poll_link_checks(urls, flag):
+    """Call last in a fragment: once checks start or finish, a full rerun switches its timer on or off"""
+    full_run = st.session_state.pop(f"{flag}_full_run", False)
+    # Never rerun from a full run; that would drop clicks on widgets drawn later in the script
+    if not full_run and get_link_queue().pending(urls) != st.session_state.get(flag, False):
+        st.rerun()
+
+TYPE_EMOJI = {'article': '📄', 'image': '🖼️', 'video': '🎬', 'pdf': '📕'}
+
+def toggle_selected(result_id):
+    if st.session_state[f"cb_{result_id}"]:
+        st.session_state.selected_items.add(result_id)
+    else:
+        st.session_state.selected_items.discard(result_id)
+
+def clear_selection():
+    st.session_state.selected_items.clear()
+    for key in [k for k in st.session_state if str(k).startswith("cb_")]:
+        del st.session_state[key]
+
+def link_status_caption(status):
+    """Short badge for a checked link, or None while it hasn't been checked"""
+    if status is None:
+        return None
+    if status['state'] == 'dead':
+        return f"⚠️ Dead link ({status['status_code'] or 'host not found'})"
+    if status['state'] == 'unverified':
+        return f"❔ Couldn't verify link ({status['status_code'] or 'unreachable'})"
+    if status['homepage_redirect']:
+        return "↪️ Redirects to the site's homepage"
+    return f"✅ Link OK · {status['kind']}"
+
+def render_result(result, selectable=True, link_status=None):
+    """Draw one search result card, with a selection checkbox once results are final"""
+    with st.container(border=True):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.markdown(f"{TYPE_EMOJI.get(result.get('type'), '📄')} **{result.get('title', result['url'])}**")
+            st.caption(result.get('description', ''))
+            if result.get('boards'):
+                st.caption(f"📌 Pinned on {', '.join(result['boards'])}")
+            elif result.get('query'):
+                st.caption(f"🔎 Found searching “{result['query']}”")
+            badge = link_status_caption(link_status)
+            if badge:
+                st.caption(badge)
+            st.markdown(f"[View Source]({result['url']})")
+        if selectable:
+            with col2:
+                st.checkbox("Select", value=result['id'] in st.session_state.selected_items, key=f"cb_{result['id']}",
+                            on_change=toggle_selected, args=(result['id'],))
+
+def results_view(boards):
+    """Result list and pin bar; ticking a checkbox reruns only this fragment, which also polls while link checks run"""
+    urls = [r['url'] for r in st.session_state.search_results]
+    st.fragment(results_fragment, run_every=link_poll_interval('results_link_polling', urls))(boards)
+
+def results_fragment(boards):
+    results = st.session_state.search_results
+    urls = [r['url'] for r in results]
+    if not results:
+        poll_link_checks(urls, 'results_link_polling')
+        return
+    for notice in st.session_state.get('search_notices', []):
+        st.warning(notice)
+    col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
     with col1:
-        query = st.text_input("What are you researching?", placeholder="e.g., 1860s Ireland fashion")
-    
+        st.subheader(f"Found {len(results)} sources")
     with col2:
-        content_type = st.selectbox(
-            "Content Type",
-            ["all", "images", "articles", "videos", "pdfs"],
-            format_func=lambda x: {
-                "all": "📚 All Types",
-                "images": "🖼️ Images Only",
-                "articles": "📄 Articles Only", 
-                "videos": "🎬 Videos Only",
-                "pdfs": "📕 PDFs Only"
-            }[x]
-        )
-    
-    if st.button("🔍 Search with AI", type="primary", use_container_width=True):
-        if query:
-            with st.spinner(f"AI is searching for {content_type}..."):
-                st.session_state.search_results = search_with_ai(query, content_type)
-                st.session_state.selected_items.clear()
-                st.rerun()
+        if st.button("🔗 Check links", use_container_width=True, help="Re-check every link now"):
+            with st.spinner("Checking links..."):
+                check_links(urls, refresh=True)
     
-    if st.session_state.search_results:
-        st.subheader(f"Found {len(st.session_state.search_results)} sources")
-        for result in st.session_state.search_results:
-            with st.container(border=True):
-                col1, col2 = st.columns([4, 1])
-                with col1:
-                    emoji = {'article': '📄', 'image': '🖼️', 'video': '🎬', 'pdf': '📕'}
-                    st.markdown(f"{emoji.get(result['type'], '📄')} **{result['title']}**")
-                    st.caption(result.get('description', ''))
-                    st.markdown(f"[View Source]({result['url']})")
-                with col2:
-                    checked = result['id'] in st.session_state.selected_items
-                    if st.checkbox("Select", value=checked, key=f"cb_{result['id']}"):
-                        st.session_state.selected_items.add(result['id'])
-                    else:
-                        st.session_state.selected_items.discard(result['id'])
-
-with tab2:
-    st.title(st.session_state.current_board)
-    items = st.session_state.pinned_items.get(st.session_state.current_board, [])
+    selected = st.session_state.selected_items
+    if selected:
+        with st.container(border=True):
+            col1, col2, col3, col4 = st.columns([2, 3, 1, 1], vertical_alignment="bottom")
+            with col1:
+                st.write(f"**{len(selected)} selected**")
+            with col2:
+                target = st.selectbox("Pin to board:", boards,
+                                      index=boards.index(st.session_state.current_board) if st.session_state.current_board in boards else 0)
+            with col3:
+                if st.button("📌 Pin", type="primary", use_container_width=True):
+                    items = [r for r in results if r['id'] in selected]
+                    pinned = pin_items(target, items)
+                    clear_selection()
+                    st.toast(f"Pinned {pinned} items to {target}!")
+                    st.rerun()
+            with col4:
+                if st.button("Clear", use_container_width=True):
+                    clear_selection()
+                    st.rerun(scope="fragment")
     
-    if not items:
+    link_statuses = get_link_statuses(urls)
+    with timed("render_results", fields={"items": len(results)}):
+        for result in results:
+            render_result(result, link_status=link_statuses.get(result['url']))
+    poll_link_checks(urls, 'results_link_polling')
+
+def board_page(board):
+    """Pin count, page count, current page and its pins, with the saved page clamped to the board's size"""
+    total = count_board_items(board)
+    page_size = st.session_state.setdefault('board_page_size', BOARD_PAGE_SIZE)
+    pages = max(1, (total + page_size - 1) // page_size)
+    page_key = f"board_page_{board}"
+    page = st.session_state[page_key] = min(st.session_state.get(page_key, 0), pages - 1)
+    with timed("load_board", fields={"items": page_size}):
+        items = load_board_items(board, page_size, page * page_size) if total else []
+    return total, pages, page, items
+
+def stale_link_urls(urls):
+    """URLs whose status is missing or past its TTL"""
+    statuses = get_link_statuses(urls)
+    return [url for url in urls if url not in statuses]
+
+def board_view(board):
+    """One page of a board; paging reruns only this fragment, so cost tracks page size, not board size"""
+    urls = [item['url'] for item in board_page(board)[3]]
+    # Recheck pins whose status is missing or past the TTL; badges appear as the checks finish
+    queue_link_checks(stale_link_urls(urls))
+    st.fragment(board_fragment, run_every=link_poll_interval('board_link_polling', urls))(board)
+
+def board_fragment(board):
+    total, pages, page, items = board_page(board)
+    urls = [item['url'] for item in items]
+    if not total:
+        poll_link_checks(urls, 'board_link_polling')
         st.info("No items yet. Use Search to find content.")
+        return
+    page_key = f"board_page_{board}"
+    
+    def turn_page(step):
+        st.session_state[page_key] += step
+    
+    col1, col2, col3, col4, col5 = st.columns([2, 1, 1, 1, 1], vertical_alignment="center")
+    with col1:
+        st.write(f"**{total} items**" if pages == 1 else f"**{total} items** · page {page + 1} of {pages}")
+    with col2:
+        st.selectbox("Per page", BOARD_PAGE_SIZES, key='board_page_size', label_visibility="collapsed",
+                     format_func=lambda n: f"{n} per page")
+    with col3:
+        st.button("◀ Prev", disabled=page == 0, use_container_width=True, on_click=turn_page, args=(-1,))
+    with col4:
+        st.button("Next ▶", disabled=page >= pages - 1, use_container_width=True, on_click=turn_page, args=(1,))
+    with col5:
+        check_clicked = st.button("🔗 Check links", use_container_width=True, help="Check the links on this page")
+    
+    if check_clicked:
+        with st.spinner("Checking links..."):
+            link_statuses = check_links(urls, refresh=True)
     else:
-        st.write(f"**{len(items)} items**")
+        # After paging, this page's stale pins still need checking
+        queue_link_checks(stale_link_urls(urls))
+        link_statuses = get_link_statuses(urls)
+    with timed("render_board", fields={"items": len(items)}):
         cols = st.columns(3)
         for idx, item in enumerate(items):
             with cols[idx % 3]:
                 with st.container(border=True):
-                    emoji = {'article': '📄', 'image': '🖼️', 'video': '🎬', 'pdf': '📕'}
-                    st.markdown(f"### {emoji.get(item['type'], '📄')} {item['title']}")
+                    st.markdown(f"### {TYPE_EMOJI.get(item['type'], '📄')} {item['title']}")
                     st.caption(f"{item['type']} • {item['added']}")
                     st.write(item.get('description', ''))
+                    badge = link_status_caption(link_statuses.get(item['url']))
+                    if badge:
+                        st.caption(badge)
                     st.markdown(f"[Open]({item['url']})")
+    poll_link_checks(urls, 'board_link_polling')
+
+def batch_job_active(job):
+    return job['done'] + job['failed'] < job['total']
+
+def batch_jobs_view(boards):
+    """Recent batch jobs; polls the database instead of holding a request open per search, but only while a job is unfinished"""
+    polling = any(batch_job_active(job) for job in list_batch_jobs())
+    st.fragment(batch_jobs_fragment, run_every=BATCH_POLL_SECONDS if polling else None)(boards, polling)
+
+def batch_jobs_fragment(boards, polling):
+    jobs = list_batch_jobs()
+    if polling:
+        if not any(batch_job_active(job) for job in jobs):
+            # Everything finished; a full rerun redraws this view without the timer
+            st.rerun()
+        # Sweeping here means a crashed worker's tasks don't stay 'running' forever
+        requeue_stale_batch_tasks()
+    if not jobs:
+        st.info("No batch jobs yet.")
+        return
+    for job in jobs:
+        finished = job['done'] + job['failed']
+        with st.container(border=True):
+            status = "✅ Finished" if finished == job['total'] else f"⏳ {job['running']} running"
+            st.markdown(f"**{job['name']}** · {finished}/{job['total']} searches · {status}")
+            st.progress(finished / job['total'])
+            notes = []
+            if job['failed']:
+                notes.append(f"{job['failed']} failed")
+            if job['board']:
+                notes.append(f"auto-pinning to {job['board']}")
+            if notes:
+                st.caption(" · ".join(notes))
+            if finished == job['total'] and job['done'] and not job['board']:
+                col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
+                with col1:
+                    target = st.selectbox("Pin all results to", boards, key=f"batch_board_{job['id']}")
+                with col2:
+                    if st.button("📌 Pin all", key=f"batch_pin_{job['id']}", use_container_width=True):
+                        st.toast(f"Pinned {pin_batch_results(job['id'], target)} items to {target}!")
+            with st.expander("Searches"):
+                st.dataframe(load_batch_tasks(job['id']), use_container_width=True, hide_index=True)
+
+def write_prometheus_dump():
+    """Write the current metrics for a node_exporter textfile collector or similar scraper"""
+    text = get_metrics().prometheus_text()
+    tmp_path = f"{METRICS_PROM_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, METRICS_PROM_PATH)
+    return text
+
+@st.fragment
+def diagnostics_view():
+    """Search latency, fallback rate and token cost from the metrics log"""
+    # Every full rerun runs every tab, so only sessions that asked for the dashboard pay for it
+    if not st.toggle("Show dashboard", key="diagnostics_on", help="Reads and summarizes the metrics log"):
+        st.caption("Turn on the dashboard to load search metrics.")
+        return
+    
+    windows = {"Last 24 hours": 24 * 3600, "Last 7 days": 7 * 24 * 3600, "Last 30 days": 30 * 24 * 3600}
+    col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
+    with col1:
+        window = st.selectbox("Window", list(windows), key="diagnostics_window")
+    with col2:
+        if st.button("🔄 Reload", use_container_width=True):
+            load_metric_events.clear()
+    
+    # Round to the minute so load_metric_events stays cached between reruns
+    since = int(time.time() // 60 * 60) - windows[window]
+    df = load_metric_events(since, metrics_log_stamp())
+    if df.empty or "search" not in set(df["event"]):
+        st.info("No searches recorded in this window yet.")
+        return
+    
+    searches = df[df["event"] == "search"]
+    live = searches[searches["source"].isin(["ai", "partial"])]
+    fallbacks = df[df["event"] == "fallback"]
+    usage = df[df["event"] == "usage"] if "usage" in set(df["event"]) else df.iloc[0:0]
+    cost = usage["cost_usd"].sum() if not usage.empty else 0.0
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Searches", len(searches))
+    col2.metric("p50 latency", f"{live['ms'].quantile(0.5) / 1000:.1f}s" if not live.empty else "–")
+    col3.metric("p95 latency", f"{live['ms'].quantile(0.95) / 1000:.1f}s" if not live.empty else "–")
+    col4.metric("Fallback rate", f"{len(fallbacks) / len(searches):.0%}")
+    col5.metric("Token cost", f"${cost:.2f}")
+    st.caption(f"Cache hit rate {(searches['source'] == 'cache').mean():.0%}")
+    
+    freq = "h" if windows[window] <= 24 * 3600 else "D"
+    st.subheader("Latency over time")
+    if not live.empty:
+        latency = live.set_index("time")["ms"].resample(freq)
+        st.line_chart((latency.quantile(0.5).to_frame("p50").join(latency.quantile(0.95).to_frame("p95")) / 1000).dropna())
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Fallback rate")
+        per_period = searches.set_index("time")["source"].resample(freq).count()
+        fallback_counts = fallbacks.set_index("time")["event"].resample(freq).count().reindex(per_period.index, fill_value=0)
+        st.line_chart((fallback_counts / per_period).dropna().to_frame("fallback rate"))
+    with col2:
+        st.subheader("Token cost (USD)")
+        if not usage.empty:
+            st.bar_chart(usage.set_index("time")["cost_usd"].resample(freq).sum().to_frame("cost"))
+    
+    st.subheader("Latency by content type")
+    if not live.empty:
+        st.dataframe(live.groupby("content_type")["ms"].describe(percentiles=[0.5, 0.95])[["count", "50%", "95%", "max"]].round(0),
+                     use_container_width=True)
+    
+    spans = df[df["event"] == "span"]
+    if not spans.empty:
+        st.subheader("Pipeline stages (ms)")
+        st.dataframe(spans.groupby("stage")["ms"].describe(percentiles=[0.5, 0.95])[["count", "50%", "95%", "max"]].round(1),
+                     use_container_width=True)
+    
+    with st.expander("Prometheus metrics (this process)"):
+        text = get_metrics().prometheus_text()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Download", text, file_name="indelible_metrics.prom", mime="text/plain", use_container_width=True)
+        with col2:
+            if st.button("💾 Write textfile", use_container_width=True, help=f"Write {METRICS_PROM_PATH} for a textfile collector"):
+                write_prometheus_dump()
+                st.toast(f"Wrote {METRICS_PROM_PATH}")
+        st.code(text, language=None)
+
+def main():
+    """Draw the page; runs when Streamlit executes this file, not when it is imported"""
+    st.set_page_config(page_title="Indelible Frame", page_icon="🎬", layout="wide")
+    
+    if 'current_board' not in st.session_state:
+        st.session_state.current_board = '1860s Ireland'
+        st.session_state.search_results = []
+        st.session_state.selected_items = set()
+    
+    with st.sidebar:
+        st.title("🎬 Indelible Frame")
+        st.divider()
+        
+        boards = list_boards()
+        board = st.selectbox("Project Boards", boards,
+                             index=boards.index(st.session_state.current_board) if st.session_state.current_board in boards else 0)
+        st.session_state.current_board = board
+        
+        new = st.text_input("New board name")
+        if st.button("Create") and new:
+            if create_board(new):
+                st.rerun()
+        
+        st.divider()
+        if st.button("🧹 Clear search cache"):
+            st.toast(f"Removed {invalidate_cache()} cached searches")
+    
+    tab1, tab2, tab3, tab4 = st.tabs(["🔍 Search", f"📋 {st.session_state.current_board}", "🗂️ Batch Research", "🩺 Diagnostics"])
+    
+    with tab1:
+        st.title("AI Research Search")
+        search_mode = st.radio("Search in", ["ai", "library"], horizontal=True, label_visibility="collapsed",
+                               format_func=lambda x: {"ai": "🤖 Search the web with AI", "library": "📚 Search my library"}[x])
+        
+        col1, col2 = st.columns([3, 1])
+        
+        with col1:
+            query = st.text_input("What are you researching?", placeholder="e.g., 1860s Ireland fashion")
+        
+        with col2:
+            content_type = st.selectbox(
+                "Content Type",
+                ["all", "images", "articles", "videos", "pdfs"],
+                format_func=lambda x: {
+                    "all": "📚 All Types",
+                    "images": "🖼️ Images Only",
+                    "articles": "📄 Articles Only", 
+                    "videos": "🎬 Videos Only",
+                    "pdfs": "📕 PDFs Only"
+                }[x]
+            )
+        
+        if search_mode == "library":
+            # Answer from the local index as the query changes; no API call involved
+            library_search = (query, content_type)
+            if st.session_state.get('library_search') != library_search:
+                st.session_state.library_search = library_search
+                with timed("library_search", content_type=content_type):
+                    st.session_state.search_results = search_library(query, content_type)
+                st.session_state.search_notices = []
+                clear_selection()
+            if query and not st.session_state.search_results:
+                st.info("Nothing in your library matches yet.")
+        else:
+            st.session_state.pop('library_search', None)
+            col1, col2, col3 = st.columns([3, 1, 1])
+            with col1:
+                search_clicked = st.button("🔍 Search with AI", type="primary", use_container_width=True)
+            with col2:
+                refresh_clicked = st.button("🔄 Refresh", use_container_width=True, help="Skip the cache and search again")
+            with col3:
+                stream_results = st.toggle("⚡ Stream", value=True, help="Show sources as soon as they arrive")
+            
+            if search_clicked or refresh_clicked:
+                if query:
+                    st.session_state.search_notices = []
+                    if stream_results:
+                        results = []
+                        status = st.empty()
+                        status.info(f"AI is searching for {content_type}...")
+                        with st.container():
+                            for result in stream_search_with_ai(query, content_type, refresh=refresh_clicked):
+                                results.append(result)
+                                status.info(f"Found {len(results)} sources so far...")
+                                render_result(result, selectable=False)
+                        st.session_state.search_results = results
+                    else:
+                        with st.spinner(f"AI is searching for {content_type}..."):
+                            st.session_state.search_results = search_with_ai(query, content_type, refresh=refresh_clicked)
+                    queue_link_checks([r['url'] for r in st.session_state.search_results])
+                    clear_selection()
+                    st.rerun()
+        
+        results_view(boards)
+    
+    with tab2:
+        st.title(st.session_state.current_board)
+        board_view(st.session_state.current_board)
+    
+    with tab3:
+        st.title("Batch Research")
+        # Starting the pool here also resumes tasks an earlier server process left unfinished
+        get_batch_executor()
+        with st.form("batch_form", clear_on_submit=True):
+            batch_queries = st.text_area("Queries (one per line)", placeholder="1860s Ireland costumes\n1860s Ireland architecture\n1860s Ireland transport")
+            col1, col2 = st.columns(2)
+            with col1:
+                batch_types = st.multiselect("Content types", BATCH_CONTENT_TYPES, default=["images", "articles"])
+            with col2:
+                batch_board = st.selectbox("Auto-pin results to", [None] + boards, format_func=lambda b: "Don't auto-pin" if b is None else b)
+            if st.form_submit_button("🚀 Queue searches", type="primary"):
+                queries = list(dict.fromkeys(q.strip() for q in batch_queries.splitlines() if q.strip()))
+                if queries and batch_types:
+                    name = queries[0] if len(queries) == 1 else f"{queries[0]} + {len(queries) - 1} more"
+                    submit_batch(name, queries, batch_types, batch_board)
+                    st.toast(f"Queued {len(queries) * len(batch_types)} searches")
+        batch_jobs_view(boards)
+    
+    with tab4:
+        st.title("Diagnostics")
+        diagnostics_view()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Offline stand-in for the parts of the anthropic SDK that app.py uses.
+
+install() puts this module in sys.modules under the name "anthropic", so the
+app's lazy `import anthropic` picks it up. Responses are synthetic: a short
+preamble, a JSON array of sources and optional padding, with configurable
+latency, size and malformed-JSON rate.
+"""
+import json
+import random
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+config = {
+    "latency": 0.05,       # seconds before the response (or first stream event) arrives
+    "results": 15,         # sources per response
+    "padding": 0,          # extra characters of prose after the array
+    "malformed_rate": 0.0, # fraction of responses whose JSON array is cut short
+    "chunk_size": 64,      # characters per streamed text delta
+    "seed": 1234,
+}
+
+_random = random.Random(config["seed"])
+
+
+def configure(**kwargs):
+    config.update(kwargs)
+    _random.seed(config["seed"])
+
+
+def synthetic_response(query, content_type, results=15, padding=0, malformed=False):
+    """Model-style text containing a JSON array of `results` sources"""
+    kind = {"images": "image", "articles": "article", "videos": "video", "pdfs": "pdf"}.get(content_type, "article")
+    sources = [{
+        "id": str(i + 1),
+        "title": f"{query} source {i + 1}",
+        "url": f"https://example.org/{content_type}/{i + 1}?q={query.replace(' ', '+')}",
+        "description": f"Synthetic {kind} about {query} with an escaped \"quote\" and a brace }} in it.",
+        "type": kind,
+    } for i in range(results)]
+    text = json.dumps(sources, indent=2)
+    if malformed:
+        text = text[:len(text) // 2]
+    filler = ("Additional notes on the sources above. " * (padding // 39 + 1))[:padding]
+    return f"Here are the sources I found:\n```json\n{text}\n```\n{filler}"
+
+
+class APIError(Exception):
+    pass
+
+
+class APIConnectionError(APIError):
+    pass
+
+
+class APITimeoutError(APIConnectionError):
+    pass
+
+
+class APIStatusError(APIError):
+    def __init__(self, message, status_code=500, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+def _usage(text):
+    return SimpleNamespace(
+        input_tokens=600,
+        output_tokens=len(text) // 4,
+        server_tool_use=SimpleNamespace(web_search_requests=1),
+    )
+
+
+def _prompt_args(kwargs):
+    """Recover the query and content type from the search prompt"""
+    content = kwargs["messages"][0]["content"]
+    query = re.search(r'Search the web for: "(.*)"', content).group(1)
+    content_type = re.search(r'"type": "(\w+)"', content).group(1)
+    return query, content_type
+
+
+def _next_text(kwargs):
+    query, content_type = _prompt_args(kwargs)
+    malformed = _random.random() < config["malformed_rate"]
+    return synthetic_response(query, content_type, config["results"], config["padding"], malformed)
+
+
+class _Stream:
+    def __init__(self, text):
+        self.text = text
+
+    def __enter__(self):
+        time.sleep(config["latency"])
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        yield SimpleNamespace(type="content_block_start", content_block=SimpleNamespace(type="server_tool_use"))
+        yield SimpleNamespace(type="content_block_start", content_block=SimpleNamespace(type="web_search_tool_result"))
+        yield SimpleNamespace(type="content_block_start", content_block=SimpleNamespace(type="text"))
+        size = config["chunk_size"]
+        for i in range(0, len(self.text), size):
+            yield SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=self.text[i:i + size]))
+
+    def get_final_message(self):
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=self.text)], usage=_usage(self.text))
+
+
+class _Messages:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        text = _next_text(kwargs)
+        time.sleep(config["latency"])
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], usage=_usage(text))
+
+    def stream(self, **kwargs):
+        self.calls += 1
+        return _Stream(_next_text(kwargs))
+
+
+class Anthropic:
+    def __init__(self, api_key=None, timeout=None, max_retries=None, **kwargs):
+        self.messages = _Messages()
+
+
+def install():
+    sys.modules["anthropic"] = sys.modules[__name__]
@@ -0,0 +1,98 @@
+"""Local HTTP stand-in for the link checker.
+
+serve() starts a threaded server on a free localhost port and returns it;
+its routes cover each outcome check_links distinguishes:
+
+    /page.html         200 text/html
+    /photo.jpg         200 image/jpeg
+    /paper.pdf         200 application/pdf
+    /clip.mp4          200 video/mp4
+    /gone              404
+    /broken            500 on HEAD and GET
+    /forbidden         403 on HEAD and GET (a bot-blocking site)
+    /no-head.pdf       405 on HEAD, 200 application/pdf on GET
+    /moved             302 to /photo.jpg
+    /deep/article      302 to / (a homepage redirect)
+    /slow.html         200 after `delay` seconds
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROUTES = {
+    "/": (200, "text/html"),
+    "/page.html": (200, "text/html; charset=utf-8"),
+    "/photo.jpg": (200, "image/jpeg"),
+    "/paper.pdf": (200, "application/pdf"),
+    "/clip.mp4": (200, "video/mp4"),
+    "/broken": (500, "text/plain"),
+    "/forbidden": (403, "text/html"),
+    "/slow.html": (200, "text/html"),
+}
+REDIRECTS = {"/moved": "/photo.jpg", "/deep/article": "/"}
+
+
+class Handler(BaseHTTPRequestHandler):
+    delay = 0.0
+    body = b"x" * 2048
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self, include_body):
+        path = self.path.split("?")[0]
+        if path == "/slow.html":
+            time.sleep(self.delay)
+        if path in REDIRECTS:
+            self.send_response(302)
+            self.send_header("Location", REDIRECTS[path])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if path == "/no-head.pdf":
+            if not include_body:
+                self.send_response(405)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status, content_type = 200, "application/pdf"
+        else:
+            status, content_type = ROUTES.get(path, (404, "text/html"))
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(self.body) if include_body else 0))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(self.body)
+
+    def do_HEAD(self):
+        self.respond(include_body=False)
+
+    def do_GET(self):
+        self.respond(include_body=True)
+
+
+# What check_links should conclude for each route: (state, kind, homepage_redirect, final path)
+EXPECTED = {
+    "/page.html": ("ok", "html", False, "/page.html"),
+    "/photo.jpg": ("ok", "image", False, "/photo.jpg"),
+    "/paper.pdf": ("ok", "pdf", False, "/paper.pdf"),
+    "/clip.mp4": ("ok", "video", False, "/clip.mp4"),
+    "/gone": ("dead", "html", False, "/gone"),
+    "/broken": ("dead", "other", False, "/broken"),
+    "/forbidden": ("unverified", "html", False, "/forbidden"),
+    "/no-head.pdf": ("ok", "pdf", False, "/no-head.pdf"),
+    "/moved": ("ok", "image", False, "/photo.jpg"),
+    "/deep/article": ("ok", "html", True, "/"),
+    "/slow.html": ("ok", "html", False, "/slow.html"),
+}
+
+
+def serve(delay=0.0):
+    """Start the stand-in server in a daemon thread; call .shutdown() when done"""
+    Handler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.base_url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,299 @@
+"""Offline benchmarks for Indelible Frame.
+
+Runs entirely without network access: the anthropic SDK is replaced by
+fake_anthropic, links are checked against fake_links on localhost, and
+every database and metrics file goes to a temp dir.
+
+    python benchmarks/run.py                       # full run, writes bench_report.json
+    python benchmarks/run.py --quick               # fewer repeats, no 10k board
+    python benchmarks/run.py --baseline old.json   # exit 1 if anything got slower or bigger
+
+Measures search_with_ai end to end (cache miss, cache hit, fan-out, streaming,
+malformed responses), local library search, link checking against a
+local HTTP stand-in, JSON extraction on 4k-100k character responses,
+generate_demo_results, and full script reruns through Streamlit's AppTest
+with boards of 100, 1k and 10k pinned items.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import fake_anthropic
+import fake_links
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+BOARD = "1860s Ireland"
+# The regex search_with_ai used before the incremental parser, kept as a reference point
+LEGACY_JSON_PATTERN = re.compile(r'\[\s*\{[\s\S]*\}\s*\]')
+
+
+def summarize(samples_ms):
+    samples = sorted(samples_ms)
+    return {
+        "runs": len(samples),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+def measure(fn, repeat):
+    fn()  # warm-up, not recorded
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def load_app(workdir):
+    """Import app.py as a module against a scratch database; the page itself only draws under `streamlit run` or AppTest"""
+    os.environ.update({
+        "INDELIBLE_DB_PATH": os.path.join(workdir, "bench.db"),
+        "INDELIBLE_METRICS_PATH": os.path.join(workdir, "metrics.jsonl"),
+        "INDELIBLE_METRICS_PROM_PATH": os.path.join(workdir, "metrics.prom"),
+        # The fake backend has no rate limit, so don't let the token bucket skew timings
+        "INDELIBLE_API_REQUESTS_PER_MINUTE": "1000000",
+        "INDELIBLE_API_BURST": "1000000",
+        # fake_links serves on localhost, which the link checker otherwise refuses
+        "INDELIBLE_LINK_ALLOW_PRIVATE_HOSTS": "1",
+        # Keep AppTest reruns offline; bench_link_check calls check_links directly
+        "INDELIBLE_LINK_BACKGROUND_CHECKS": "0",
+    })
+    spec = importlib.util.spec_from_file_location("indelible_app", APP_PATH)
+    app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+    return app
+
+
+def bench_search(app, repeat):
+    results = {}
+    queries = iter(range(10 ** 9))
+    fake_anthropic.configure(malformed_rate=0.0)
+
+    results["search_with_ai[images,miss]"] = measure(lambda: app.search_with_ai(f"bench {next(queries)}", "images", refresh=True), repeat)
+    app.search_with_ai("bench cached", "images")
+    results["search_with_ai[images,hit]"] = measure(lambda: app.search_with_ai("bench cached", "images"), repeat * 5)
+    results["search_with_ai[all,miss]"] = measure(lambda: app.search_with_ai(f"bench {next(queries)}", "all", refresh=True), repeat)
+
+    first = []
+    def stream_once():
+        start = time.perf_counter()
+        for i, _ in enumerate(app.stream_search_with_ai(f"bench {next(queries)}", "images", refresh=True)):
+            if i == 0:
+                first.append((time.perf_counter() - start) * 1000)
+    results["stream_search_with_ai[images,total]"] = measure(stream_once, repeat)
+    results["stream_search_with_ai[images,first_result]"] = summarize(first)
+
+    # A cut-short array still yields the sources before the cut; only an empty parse falls back
+    fake_anthropic.configure(malformed_rate=0.3)
+    short = fallbacks = short_cached = 0
+    def malformed_once():
+        nonlocal short, fallbacks, short_cached
+        query = f"bench {next(queries)}"
+        found = app.search_with_ai(query, "images", refresh=True)
+        if "example.org" not in found[0]["url"]:
+            fallbacks += 1
+        elif len(found) < fake_anthropic.config["results"]:
+            short += 1
+            short_cached += app.get_cached_results(query, "images") is not None
+    stats = measure(malformed_once, repeat * 2)
+    stats["short_rate"] = round(short / stats["runs"], 3)
+    stats["fallback_rate"] = round(fallbacks / stats["runs"], 3)
+    if short_cached:
+        raise RuntimeError(f"{short_cached} truncated responses were cached as complete answers")
+    results["search_with_ai[images,malformed=0.3]"] = stats
+    fake_anthropic.configure(malformed_rate=0.0)
+    return results
+
+
+def bench_extraction(app, repeat):
+    results = {}
+    for size in (4_000, 16_000, 64_000, 100_000):
+        # Roughly 200 characters per pretty-printed source
+        text = fake_anthropic.synthetic_response("1860s Ireland fashion", "images", results=max(1, size // 200))
+        text += "x" * max(0, size - len(text))
+        label = f"{size // 1000}k"
+        results[f"extract_json_results[{label}]"] = dict(measure(lambda: app.extract_json_results(text), repeat * 5), chars=len(text))
+        results[f"legacy_regex[{label}]"] = dict(measure(lambda: json.loads(LEGACY_JSON_PATTERN.search(text).group(0)), repeat * 5), chars=len(text))
+    return results
+
+
+def bench_library(app, repeat):
+    """Full-text library search over everything bench_search returned"""
+    return {
+        "search_library[all]": measure(lambda: app.search_library("bench source"), repeat * 5),
+        "search_library[images,prefix]": measure(lambda: app.search_library("sour", "images"), repeat * 5),
+    }
+
+
+def verify_link_outcomes(statuses):
+    """Raise unless every stand-in route got the outcome fake_links.EXPECTED says it should"""
+    from urllib.parse import urlsplit
+
+    wrong = []
+    for url, status in statuses.items():
+        path = urlsplit(url).path
+        got = (status["state"], status["kind"], bool(status["homepage_redirect"]), urlsplit(status["final_url"] or "").path)
+        if got != fake_links.EXPECTED[path]:
+            wrong.append(f"{path}: expected {fake_links.EXPECTED[path]}, got {got} ({status['error']})")
+    if wrong:
+        raise RuntimeError("link checker outcomes changed:\n  " + "\n  ".join(sorted(set(wrong))))
+
+
+def bench_link_check(app, repeat):
+    """check_links against the local stand-in server: a fresh check of 100 URLs, then status-index hits"""
+    server = fake_links.serve(delay=0.05)
+    paths = list(fake_links.EXPECTED)
+    urls = [f"{server.base_url}{paths[i % len(paths)]}?i={i}" for i in range(100)]
+    try:
+        fresh = measure(lambda: app.check_links(urls, refresh=True), repeat)
+        statuses = app.check_links(urls)
+        verify_link_outcomes(statuses)
+        fresh["dead"] = sum(s["state"] == "dead" for s in statuses.values())
+        fresh["unverified"] = sum(s["state"] == "unverified" for s in statuses.values())
+        fresh["homepage_redirects"] = sum(bool(s["homepage_redirect"]) for s in statuses.values())
+        return {
+            "check_links[100,fresh]": fresh,
+            "check_links[100,cached]": measure(lambda: app.check_links(urls), repeat * 5),
+        }
+    finally:
+        server.shutdown()
+
+
+def bench_demo_results(app, repeat):
+    return {
+        f"generate_demo_results[{content_type}]": measure(lambda: app.generate_demo_results("1860s Ireland fashion", content_type), repeat * 20)
+        for content_type in ("all", "images", "articles", "videos", "pdfs")
+    }
+
+
+def seed_board(app, db_path, count):
+    import streamlit as st
+
+    os.environ["INDELIBLE_DB_PATH"] = db_path
+    app.DB_PATH = db_path
+    st.cache_resource.clear()
+    app.init_db()
+    items = [{"title": f"Pinned source {i}", "url": f"https://example.org/pins/{i}", "type": ("image", "article", "video", "pdf")[i % 4],
+              "description": "Seeded by the benchmark"} for i in range(count)]
+    app.pin_items(BOARD, items)
+
+
+def bench_reruns(app, workdir, sizes, repeat):
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    for count in sizes:
+        seed_board(app, os.path.join(workdir, f"board_{count}.db"), count)
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+
+        start = time.perf_counter()
+        at.run()
+        results[f"apptest_first_run[board={count}]"] = {"ms": round((time.perf_counter() - start) * 1000, 3)}
+        if at.exception:
+            raise RuntimeError(f"app raised during benchmark: {at.exception[0].value}")
+
+        results[f"apptest_rerun[board={count}]"] = measure(at.run, repeat)
+
+        def next_page():
+            buttons = [b for b in at.button if b.label == "Next ▶" and not b.disabled]
+            (buttons[0].click() if buttons else at).run()
+        results[f"apptest_next_page[board={count}]"] = measure(next_page, repeat)
+
+        tracemalloc.start()
+        at.run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"apptest_rerun_memory[board={count}]"] = {"peak_kb": round(peak / 1024, 1)}
+
+    # Selecting a result with 15 sources on screen
+    at = AppTest.from_file(APP_PATH, default_timeout=120).run()
+    at.text_input[0].input("1860s Ireland fashion")
+    [s for s in at.selectbox if s.label == "Content Type"][0].select("images")
+    at.button[0].click().run()
+    toggles = iter(range(10 ** 9))
+    results["apptest_select_result"] = measure(lambda: at.checkbox[next(toggles) % len(at.checkbox)].check().run(), repeat)
+    return results
+
+
+def compare(report, baseline, tolerance):
+    """Names of measurements that regressed by more than `tolerance` against the baseline"""
+    regressions = []
+    for name, new in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        for key in ("p50_ms", "ms", "peak_kb"):
+            if key in new and key in old and new[key] > old[key] * (1 + tolerance) and new[key] - old[key] > 1:
+                regressions.append(f"{name}: {key} {old[key]} -> {new[key]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_report.json")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats and no 10k board")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake API latency in seconds")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown before a result counts as a regression")
+    args = parser.parse_args()
+
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")
+    fake_anthropic.install()
+    fake_anthropic.configure(latency=args.latency)
+    repeat = 3 if args.quick else 10
+    sizes = (100, 1_000) if args.quick else (100, 1_000, 10_000)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = load_app(workdir)
+        results = {}
+        for step in (lambda: bench_search(app, repeat), lambda: bench_library(app, repeat),
+                     lambda: bench_link_check(app, repeat),
+                     lambda: bench_extraction(app, repeat),
+                     lambda: bench_demo_results(app, repeat), lambda: bench_reruns(app, workdir, sizes, repeat)):
+            results.update(step())
+
+    import streamlit
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "streamlit": streamlit.__version__,
+            "quick": args.quick,
+            "fake_latency_s": args.latency,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    width = max(len(name) for name in results)
+    for name, stats in results.items():
+        print(f"{name:<{width}}  " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()